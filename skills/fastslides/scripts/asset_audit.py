@@ -4,42 +4,26 @@
 from __future__ import annotations
 
 import argparse
+import heapq
 import json
-import posixpath
-import re
+import os
 import sys
 from pathlib import Path
-from urllib.parse import unquote
 
+from path_utils import classify_reference
 from path_utils import default_projects_dir as detect_default_projects_dir
-
-PROJECT_NAME_RE = re.compile(r"^[A-Za-z0-9._-]+$")
-FRONTMATTER_RE = re.compile(r"\A---\s*\n.*?\n---\s*(?:\n|$)", re.DOTALL)
-MARKDOWN_LINK_RE = re.compile(r"!?\[[^\]]*\]\(([^)]+)\)")
-ATTR_LINK_RE = re.compile(r"(?:src|href|poster)\s*=\s*[\"']([^\"']+)[\"']")
-
-EXTERNAL_PREFIXES = (
-    "http://",
-    "https://",
-    "data:",
-    "blob:",
-    "mailto:",
-    "tel:",
-)
+from path_utils import find_asset_targets
+from path_utils import frontmatter_bounds
+from path_utils import is_valid_project_name
+from path_utils import local_asset_path
+from path_utils import scan_project_tree
+from path_utils import to_rel_posix
 
 
 def default_projects_dir() -> Path:
     return detect_default_projects_dir()
 
 
-def is_inside(parent: Path, target: Path) -> bool:
-    try:
-        target.relative_to(parent)
-        return True
-    except ValueError:
-        return False
-
-
 def resolve_project_dir(args: argparse.Namespace) -> Path:
     if args.project_dir:
         return args.project_dir.expanduser().resolve()
@@ -47,83 +31,25 @@ def resolve_project_dir(args: argparse.Namespace) -> Path:
     if not args.project:
         raise ValueError("Provide --project or --project-dir.")
 
-    if not PROJECT_NAME_RE.fullmatch(args.project):
+    if not is_valid_project_name(args.project):
         raise ValueError("Invalid project name. Use letters, numbers, dot, underscore, and dash.")
 
     return (args.projects_dir.expanduser().resolve() / args.project).resolve()
 
 
-def strip_frontmatter(source: str) -> tuple[bool, str]:
-    match = FRONTMATTER_RE.match(source)
-    if not match:
-        return False, source
-    return True, source[match.end() :]
-
-
-def clean_target(raw: str) -> str:
-    value = raw.strip().strip("<>")
-    match = re.match(r'^(\S+)(?:\s+"[^"]*")?$', value)
-    if match:
-        value = match.group(1)
-    return value
-
-
-def local_asset_path(raw: str) -> str | None:
-    value = clean_target(raw)
-    lower = value.lower()
-
-    if not value:
-        return None
-    if value.startswith("#"):
-        return None
-    if lower.startswith(EXTERNAL_PREFIXES):
-        return None
-
-    no_hash = value.split("#", 1)[0]
-    no_query = no_hash.split("?", 1)[0]
-    if not no_query:
-        return None
-
-    decoded = unquote(no_query).replace("\\", "/")
-    if decoded.startswith("/"):
-        allowed = (
-            decoded == "/assets"
-            or decoded == "/images"
-            or decoded == "/media"
-            or decoded == "/data"
-            or decoded.startswith("/assets/")
-            or decoded.startswith("/images/")
-            or decoded.startswith("/media/")
-            or decoded.startswith("/data/")
-        )
-        if not allowed:
-            return None
-        decoded = decoded[1:]
-
-    normalized = posixpath.normpath(decoded)
-    return normalized
-
-
-def find_asset_targets(source: str) -> list[str]:
-    refs: list[str] = []
-    refs.extend(match.group(1) for match in MARKDOWN_LINK_RE.finditer(source))
-    refs.extend(match.group(1) for match in ATTR_LINK_RE.finditer(source))
-    return refs
-
-
-def all_asset_files(project_dir: Path) -> list[Path]:
-    files: list[Path] = []
-    for path in project_dir.rglob("*"):
-        if not path.is_file():
-            continue
-        if path.name == "page.mdx":
-            continue
-        files.append(path)
-    return files
+def strip_frontmatter(source: str) -> tuple[bool, int]:
+    bounds = frontmatter_bounds(source)
+    if bounds is None:
+        return False, 0
+    return True, bounds[2]
 
 
-def to_rel_posix(base: Path, target: Path) -> str:
-    return target.relative_to(base).as_posix()
+def all_asset_files(files: dict[str, os.DirEntry[str]]) -> list[tuple[str, int]]:
+    return [
+        (rel, entry.stat(follow_symlinks=True).st_size)
+        for rel, entry in files.items()
+        if entry.name != "page.mdx"
+    ]
 
 
 def parse_args() -> argparse.Namespace:
@@ -156,7 +82,7 @@ def main() -> int:
         return 1
 
     source = page_path.read_text(encoding="utf-8")
-    frontmatter_detected, body = strip_frontmatter(source)
+    frontmatter_detected, body_start = strip_frontmatter(source)
 
     referenced_paths: set[str] = set()
     resolved_referenced_files: set[str] = set()
@@ -164,7 +90,9 @@ def main() -> int:
     traversal_assets: list[str] = []
     directory_targets: list[str] = []
 
-    for raw in find_asset_targets(body):
+    project_root = str(project_dir.resolve())
+    project_files, project_dirs = scan_project_tree(project_dir)
+    for raw in find_asset_targets(source, body_start):
         normalized = local_asset_path(raw)
         if normalized is None:
             continue
@@ -173,40 +101,26 @@ def main() -> int:
             continue
         referenced_paths.add(normalized)
 
-        if normalized == ".." or normalized.startswith("../"):
-            traversal_assets.append(raw)
-            continue
-
-        resolved = (project_dir / normalized).resolve()
-        if not is_inside(project_dir.resolve(), resolved):
-            traversal_assets.append(raw)
-            continue
-
-        if not resolved.exists():
-            missing_assets.append(f"{raw} -> {resolved}")
-            continue
-
-        if resolved.is_dir():
+        status, resolved = classify_reference(project_root, project_files, project_dirs, normalized)
+        if status == "ok":
+            resolved_referenced_files.add(to_rel_posix(project_root, resolved))
+        elif status == "dir":
             directory_targets.append(f"{raw} -> {resolved}")
-            continue
-
-        resolved_referenced_files.add(to_rel_posix(project_dir, resolved))
+        elif status == "missing":
+            missing_assets.append(f"{raw} -> {resolved}")
+        else:
+            traversal_assets.append(raw)
 
-    files = all_asset_files(project_dir)
-    all_file_rel = sorted(to_rel_posix(project_dir, path) for path in files)
+    entries = all_asset_files(project_files)
+    all_file_rel = {rel for rel, _ in entries}
 
-    unused_assets = sorted(set(all_file_rel) - resolved_referenced_files)
+    unused_assets = sorted(all_file_rel - resolved_referenced_files)
 
-    largest = sorted(
-        (
-            {"path": to_rel_posix(project_dir, path), "bytes": path.stat().st_size}
-            for path in files
-        ),
-        key=lambda item: item["bytes"],
-        reverse=True,
-    )
-    if args.top >= 0:
-        largest = largest[: args.top]
+    top = args.top if args.top >= 0 else len(entries)
+    largest = [
+        {"path": rel, "bytes": size}
+        for rel, size in heapq.nlargest(top, entries, key=lambda entry: entry[1])
+    ]
 
     summary = {
         "project_dir": str(project_dir),
@@ -223,7 +137,8 @@ def main() -> int:
     }
 
     if args.json_output:
-        print(json.dumps(summary, indent=2))
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write("\n")
     else:
         has_errors = bool(missing_assets or traversal_assets or directory_targets)
         status = "FAIL" if has_errors else "OK"
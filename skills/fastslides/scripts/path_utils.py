@@ -3,8 +3,23 @@
 
 from __future__ import annotations
 
+import functools
 import os
+import posixpath
+import re
+import stat
+import string
+from collections.abc import Iterator, Mapping
 from pathlib import Path
+from urllib.parse import unquote
+
+PROJECT_NAME_CHARS = frozenset(string.ascii_letters + string.digits + "._-")
+SAFE_PATH_CHARS = frozenset(string.ascii_letters + string.digits + "_./-")
+TITLE_SUFFIX_RE = re.compile(r'^(\S+)(?:\s+"[^"]*")?$')
+EXTERNAL_PREFIX_RE = re.compile(r"(?:https?://|data:|blob:|mailto:|tel:)", re.IGNORECASE | re.ASCII)
+ATTR_LINK_PATTERN = r"(?:src|href|poster)\s*=\s*[\"'](?P<attr>[^\"']+)[\"']"
+ATTR_LINK_RE = re.compile(ATTR_LINK_PATTERN)
+ASSET_REF_RE = re.compile(r"!?\[(?P<text>[^\]]*)\]\((?P<md>[^)]+)\)|" + ATTR_LINK_PATTERN)
 
 
 def default_projects_dir() -> Path:
@@ -13,3 +28,169 @@ def default_projects_dir() -> Path:
         return Path(configured).expanduser().resolve()
 
     return (Path.cwd().resolve() / "projects").resolve()
+
+
+def is_valid_project_name(name: str) -> bool:
+    return bool(name) and PROJECT_NAME_CHARS.issuperset(name)
+
+
+def is_inside(parent: str, target: str) -> bool:
+    return target == parent or target.startswith(parent.rstrip(os.sep) + os.sep)
+
+
+def clean_markdown_target(raw: str) -> str:
+    value = raw.strip().strip("<>")
+    match = TITLE_SUFFIX_RE.match(value)
+    if match:
+        value = match.group(1)
+    return value
+
+
+def skip_whitespace(source: str, pos: int) -> int:
+    end = len(source)
+    while pos < end and source[pos].isspace():
+        pos += 1
+    return pos
+
+
+def frontmatter_bounds(source: str) -> tuple[int, int, int] | None:
+    # Returns (body_start, body_end, offset), where offset is the first character after the closing `---` line.
+    if not source.startswith("---"):
+        return None
+
+    opening_end = skip_whitespace(source, 3)
+    body_start = source.rfind("\n", 3, opening_end) + 1
+    while body_start > 0:
+        body_end = source.find("\n---", body_start)
+        while body_end >= 0:
+            closing_start = body_end + 4
+            closing_end = skip_whitespace(source, closing_start)
+            if closing_end == len(source):
+                return body_start, body_end, closing_end
+            line_end = source.rfind("\n", closing_start, closing_end)
+            if line_end >= 0:
+                return body_start, body_end, line_end + 1
+            body_end = source.find("\n---", body_end + 1)
+        # An empty block can only close on a newline inside the opening whitespace.
+        body_start = source.rfind("\n", 3, body_start - 1) + 1
+    return None
+
+
+@functools.lru_cache(maxsize=2048)
+def local_asset_path(raw: str) -> str | None:
+    if raw and raw[0] != "/" and SAFE_PATH_CHARS.issuperset(raw):
+        return posixpath.normpath(raw)
+
+    value = clean_markdown_target(raw)
+    if not value:
+        return None
+    if value.startswith("#"):
+        return None
+    if EXTERNAL_PREFIX_RE.match(value):
+        return None
+
+    no_hash = value.split("#", 1)[0]
+    no_query = no_hash.split("?", 1)[0]
+    if not no_query:
+        return None
+
+    decoded = unquote(no_query) if "%" in no_query else no_query
+    if "\\" in decoded:
+        decoded = decoded.replace("\\", "/")
+    if decoded.startswith("/"):
+        allowed = (
+            decoded == "/assets"
+            or decoded == "/images"
+            or decoded == "/media"
+            or decoded == "/data"
+            or decoded.startswith("/assets/")
+            or decoded.startswith("/images/")
+            or decoded.startswith("/media/")
+            or decoded.startswith("/data/")
+        )
+        if not allowed:
+            return None
+        decoded = decoded[1:]
+
+    normalized = posixpath.normpath(decoded)
+    return normalized
+
+
+def find_asset_targets(source: str, pos: int = 0) -> list[str]:
+    refs: list[str] = []
+    for match in ASSET_REF_RE.finditer(source, pos):
+        target = match.group("md")
+        if target is None:
+            refs.append(match.group("attr"))
+            continue
+        # Linked images such as [<img src="..." />](url) carry a reference inside the link text.
+        if "=" in match.group("text"):
+            inner_matches = ATTR_LINK_RE.finditer(source, match.start("text"), match.end("text"))
+            refs.extend(inner.group("attr") for inner in inner_matches)
+        refs.append(target)
+    return refs
+
+
+def classify_reference(
+    project_root: str,
+    files: Mapping[str, os.DirEntry[str]],
+    dirs: Mapping[str, os.DirEntry[str]],
+    normalized: str,
+) -> tuple[str, str]:
+    # Returns (status, resolved) with status one of: ok, dir, missing, traversal, outside.
+    if normalized == ".." or normalized.startswith("../"):
+        return "traversal", normalized
+
+    resolved = os.path.normpath(os.path.join(project_root, normalized))
+    if not is_inside(project_root, resolved):
+        return "outside", resolved
+    if normalized == ".":
+        return "dir", resolved
+
+    entry = files.get(normalized) or dirs.get(normalized)
+    if entry is not None and not entry.is_symlink():
+        return ("ok" if normalized in files else "dir"), resolved
+
+    # Symlinks, paths under symlinked directories, and case-insensitive matches are not
+    # in the scanned tree as written, so check them on disk.
+    real = os.path.realpath(resolved)
+    if not is_inside(project_root, real):
+        return "outside", real
+    try:
+        mode = os.stat(real).st_mode
+    except OSError:
+        return "missing", real
+    return ("dir" if stat.S_ISDIR(mode) else "ok"), real
+
+
+def to_rel_posix(project_root: str, path: str) -> str:
+    rel = path[len(os.path.join(project_root, "")) :]
+    return rel.replace(os.sep, "/") if os.sep != "/" else rel
+
+
+def scandir_recursive(path: str | os.PathLike[str]) -> Iterator[os.DirEntry[str]]:
+    try:
+        entries = os.scandir(path)
+    except OSError:
+        # Skip unreadable directories, as pathlib's rglob does.
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield entry
+                yield from scandir_recursive(entry.path)
+            elif entry.is_file() or entry.is_dir():
+                yield entry
+
+
+def scan_project_tree(project_dir: Path) -> tuple[dict[str, os.DirEntry[str]], dict[str, os.DirEntry[str]]]:
+    root = str(project_dir)
+    files: dict[str, os.DirEntry[str]] = {}
+    dirs: dict[str, os.DirEntry[str]] = {}
+    for entry in scandir_recursive(root):
+        rel = to_rel_posix(root, entry.path)
+        if entry.is_dir():
+            dirs[rel] = entry
+        else:
+            files[rel] = entry
+    return files, dirs
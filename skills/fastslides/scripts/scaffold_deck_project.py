@@ -4,13 +4,11 @@
 from __future__ import annotations
 
 import argparse
-import re
 import sys
 from pathlib import Path
 
 from path_utils import default_projects_dir as detect_default_projects_dir
-
-PROJECT_NAME_RE = re.compile(r"^[A-Za-z0-9._-]+$")
+from path_utils import is_valid_project_name
 
 
 def default_projects_dir() -> Path:
@@ -122,7 +120,7 @@ def parse_args() -> argparse.Namespace:
 def main() -> int:
     args = parse_args()
 
-    if args.project and not PROJECT_NAME_RE.fullmatch(args.project):
+    if args.project and not is_valid_project_name(args.project):
         print("[ERROR] Invalid project name. Use letters, numbers, dot, underscore, and dash.")
         return 1
 
@@ -5,46 +5,35 @@ from __future__ import annotations
 
 import argparse
 import json
-import posixpath
+import os
 import re
+import string
 import sys
 from pathlib import Path
-from urllib.parse import unquote
 
+from path_utils import classify_reference
 from path_utils import default_projects_dir as detect_default_projects_dir
+from path_utils import find_asset_targets
+from path_utils import frontmatter_bounds
+from path_utils import is_valid_project_name
+from path_utils import local_asset_path
+from path_utils import scan_project_tree
 
-PROJECT_NAME_RE = re.compile(r"^[A-Za-z0-9._-]+$")
-FRONTMATTER_RE = re.compile(r"\A---\s*\n(.*?)\n---\s*(?:\n|$)", re.DOTALL)
-FRONTMATTER_LINE_RE = re.compile(r"^\s*([A-Za-z0-9_-]+)\s*:\s*(.*?)\s*$")
 SLIDE_START_RE = re.compile(r"<section\s+className=[\"']slide[\"']\s*>", re.IGNORECASE)
-MARKDOWN_LINK_RE = re.compile(r"!?\[[^\]]*\]\(([^)]+)\)")
-ATTR_LINK_RE = re.compile(r"(?:src|href|poster)\s*=\s*[\"']([^\"']+)[\"']")
 WORD_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9'./-]*")
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+PARA_SPLIT_RE = re.compile(r"\n\s*\n")
+BULLET_RE = re.compile(r"^\s*(?:[-*+]\s+|\d+\.\s+)", re.MULTILINE)
 IMPORT_EXPORT_RE = re.compile(r"^\s*(import|export)\s+", re.MULTILINE)
 USE_CLIENT_RE = re.compile(r"^\s*[\"']use client[\"']\s*;?\s*$", re.MULTILINE)
 
-EXTERNAL_PREFIXES = (
-    "http://",
-    "https://",
-    "data:",
-    "blob:",
-    "mailto:",
-    "tel:",
-)
+FRONTMATTER_KEY_CHARS = frozenset(string.ascii_letters + string.digits + "_-")
 
 
 def default_projects_dir() -> Path:
     return detect_default_projects_dir()
 
 
-def is_inside(parent: Path, target: Path) -> bool:
-    try:
-        target.relative_to(parent)
-        return True
-    except ValueError:
-        return False
-
-
 def resolve_project_dir(args: argparse.Namespace) -> Path:
     if args.project_dir:
         return args.project_dir.expanduser().resolve()
@@ -52,7 +41,7 @@ def resolve_project_dir(args: argparse.Namespace) -> Path:
     if not args.project:
         raise ValueError("Provide --project or --project-dir.")
 
-    if not PROJECT_NAME_RE.fullmatch(args.project):
+    if not is_valid_project_name(args.project):
         raise ValueError("Invalid project name. Use letters, numbers, dot, underscore, and dash.")
 
     return (args.projects_dir.expanduser().resolve() / args.project).resolve()
@@ -67,104 +56,57 @@ def normalize_frontmatter_value(raw: str) -> str:
     return value.strip()
 
 
-def extract_frontmatter(source: str) -> tuple[dict[str, str], str]:
-    match = FRONTMATTER_RE.match(source)
-    if not match:
-        return {}, source
+def extract_frontmatter(source: str) -> tuple[dict[str, str], int]:
+    bounds = frontmatter_bounds(source)
+    if bounds is None:
+        return {}, 0
 
+    body_start, body_end, offset = bounds
     values: dict[str, str] = {}
-    for raw_line in match.group(1).splitlines():
+    for raw_line in source[body_start:body_end].splitlines():
         line = raw_line.strip()
         if not line or line.startswith("#"):
             continue
-        parsed = FRONTMATTER_LINE_RE.match(line)
-        if not parsed:
+        key, sep, rest = line.partition(":")
+        if not sep:
             continue
-        key = parsed.group(1).lower()
-        values[key] = normalize_frontmatter_value(parsed.group(2))
-
-    return values, source[match.end() :]
-
-
-def clean_markdown_target(raw: str) -> str:
-    value = raw.strip().strip("<>")
-    match = re.match(r'^(\S+)(?:\s+"[^"]*")?$', value)
-    if match:
-        value = match.group(1)
-    return value
-
-
-def local_asset_path(raw: str) -> str | None:
-    value = clean_markdown_target(raw)
-    lower = value.lower()
-
-    if not value:
-        return None
-    if value.startswith("#"):
-        return None
-    if lower.startswith(EXTERNAL_PREFIXES):
-        return None
-
-    no_hash = value.split("#", 1)[0]
-    no_query = no_hash.split("?", 1)[0]
-    if not no_query:
-        return None
-
-    decoded = unquote(no_query).replace("\\", "/")
-    if decoded.startswith("/"):
-        allowed = (
-            decoded == "/assets"
-            or decoded == "/images"
-            or decoded == "/media"
-            or decoded == "/data"
-            or decoded.startswith("/assets/")
-            or decoded.startswith("/images/")
-            or decoded.startswith("/media/")
-            or decoded.startswith("/data/")
-        )
-        if not allowed:
-            return None
-        decoded = decoded[1:]
-
-    normalized = posixpath.normpath(decoded)
-    return normalized
-
-
-def find_asset_targets(source: str) -> list[str]:
-    refs: list[str] = []
-    refs.extend(match.group(1) for match in MARKDOWN_LINK_RE.finditer(source))
-    refs.extend(match.group(1) for match in ATTR_LINK_RE.finditer(source))
-    return refs
+        key = key.strip()
+        if not key or not FRONTMATTER_KEY_CHARS.issuperset(key):
+            continue
+        values[key.lower()] = normalize_frontmatter_value(rest)
 
+    return values, offset
 
-def extract_slides(source: str) -> list[str]:
-    starts = list(SLIDE_START_RE.finditer(source))
-    if not starts:
-        return []
 
+def extract_slides(source: str, pos: int = 0) -> list[str]:
+    starts = list(SLIDE_START_RE.finditer(source, pos))
     slides: list[str] = []
+    has_close_tag = True
     for index, start_match in enumerate(starts):
         content_start = start_match.end()
-        content_end = source.find("</section>", content_start)
+        # Once one search misses, every later slide is unclosed as well.
+        content_end = source.find("</section>", content_start) if has_close_tag else -1
         if content_end < 0:
-            next_start = starts[index + 1].start() if index + 1 < len(starts) else len(source)
-            content_end = next_start
+            has_close_tag = False
+            content_end = starts[index + 1].start() if index + 1 < len(starts) else len(source)
         slides.append(source[content_start:content_end])
     return slides
 
 
-def count_words(text: str) -> int:
-    plain = re.sub(r"<[^>]+>", " ", text)
+def strip_tags(text: str) -> str:
+    return HTML_TAG_RE.sub(" ", text)
+
+
+def count_words(plain: str) -> int:
     return len(WORD_RE.findall(plain))
 
 
 def bullet_count(text: str) -> int:
-    return len(re.findall(r"^\s*(?:[-*+]\s+|\d+\.\s+)", text, flags=re.MULTILINE))
+    return len(BULLET_RE.findall(text))
 
 
-def max_paragraph_words(text: str) -> int:
-    plain = re.sub(r"<[^>]+>", " ", text)
-    paragraphs = [chunk.strip() for chunk in re.split(r"\n\s*\n", plain) if chunk.strip()]
+def max_paragraph_words(plain: str) -> int:
+    paragraphs = [chunk.strip() for chunk in PARA_SPLIT_RE.split(plain) if chunk.strip()]
     if not paragraphs:
         return 0
     return max(len(WORD_RE.findall(paragraph)) for paragraph in paragraphs)
@@ -205,7 +147,7 @@ def main() -> int:
         return 1
 
     source = page_path.read_text(encoding="utf-8")
-    frontmatter, body = extract_frontmatter(source)
+    frontmatter, body_start = extract_frontmatter(source)
 
     if not frontmatter:
         warnings.append(
@@ -222,20 +164,21 @@ def main() -> int:
                 f"Frontmatter project `{declared_project}` does not match folder name `{project_dir.name}`."
             )
 
-    if IMPORT_EXPORT_RE.search(body):
+    if IMPORT_EXPORT_RE.search(source, body_start):
         errors.append("Detected import/export statements in page.mdx; runtime decks should be content-only MDX.")
-    if USE_CLIENT_RE.search(body):
+    if USE_CLIENT_RE.search(source, body_start):
         warnings.append('Found "use client" directive in page.mdx; this is usually unnecessary in runtime-loaded MDX.')
 
-    slides = extract_slides(body)
+    slides = extract_slides(source, body_start)
     if not slides:
         errors.append('No `<section className="slide">` blocks were found.')
 
     slide_stats: list[dict[str, int]] = []
     for index, slide in enumerate(slides, start=1):
-        words = count_words(slide)
+        plain = strip_tags(slide)
+        words = count_words(plain)
         bullets = bullet_count(slide)
-        paragraph_words = max_paragraph_words(slide)
+        paragraph_words = max_paragraph_words(plain)
         slide_stats.append({"slide": index, "words": words, "bullets": bullets, "max_paragraph_words": paragraph_words})
 
         if words > args.max_words:
@@ -248,7 +191,9 @@ def main() -> int:
             )
 
     seen_paths: set[str] = set()
-    for raw in find_asset_targets(body):
+    project_root = str(project_dir.resolve())
+    project_tree: tuple[dict[str, os.DirEntry[str]], dict[str, os.DirEntry[str]]] | None = None
+    for raw in find_asset_targets(source, body_start):
         normalized = local_asset_path(raw)
         if normalized is None:
             continue
@@ -257,16 +202,14 @@ def main() -> int:
             continue
         seen_paths.add(normalized)
 
-        if normalized == ".." or normalized.startswith("../"):
+        if project_tree is None:
+            project_tree = scan_project_tree(project_dir)
+        status, resolved = classify_reference(project_root, *project_tree, normalized)
+        if status == "traversal":
             errors.append(f"Invalid traversal asset path: {raw}")
-            continue
-
-        resolved = (project_dir / normalized).resolve()
-        if not is_inside(project_dir.resolve(), resolved):
+        elif status == "outside":
             errors.append(f"Asset path escapes project folder: {raw}")
-            continue
-
-        if not resolved.exists():
+        elif status == "missing":
             errors.append(f"Missing asset target: {raw} -> {resolved}")
 
     summary = {
@@ -281,7 +224,8 @@ def main() -> int:
     }
 
     if args.json_output:
-        print(json.dumps(summary, indent=2))
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write("\n")
     else:
         status = "OK" if not errors and (not args.strict or not warnings) else "FAIL"
         print(f"[{status}] Validation report for {project_dir}")